@@ -7,8 +7,6 @@ from .core import GitVizProcessor
 from .user_manager import UserManager
 from .platform_utils import check_dependencies
 
-user_manager = UserManager()
-
 @click.group()
 @click.version_option(package_name="git-viz", message='%(package)s, version %(version)s') 
 def cli():
@@ -51,17 +49,19 @@ def visualize(directories, start_date: str, end_date: Optional[str],
         sys.exit(1)
 
 @cli.group()
-def users():
+@click.pass_context
+def users(ctx: click.Context):
     """Manage user mappings and avatars."""
-    pass
+    # Callers (such as tests) may supply their own manager as the context object
+    if ctx.obj is None:
+        ctx.obj = UserManager()
 
 @users.command()
 @click.argument('git-name')
 @click.argument('canonical-name')
-def map(git_name: str, canonical_name: str):
+@click.pass_obj
+def map(user_manager: UserManager, git_name: str, canonical_name: str):
     """Map a Git username to a canonical name."""
-    user_manager = UserManager()
-    
     # Check for similar existing users
     similar = user_manager.suggest_similar_users(git_name)
     if similar:
@@ -77,9 +77,9 @@ def map(git_name: str, canonical_name: str):
 @users.command()
 @click.argument('canonical-name')
 @click.argument('avatar-path', type=click.Path(exists=True))
-def set_avatar(canonical_name: str, avatar_path: str):
+@click.pass_obj
+def set_avatar(user_manager: UserManager, canonical_name: str, avatar_path: str):
     """Set an avatar for a user."""
-    user_manager = UserManager()
     try:
         user_manager.set_user_avatar(canonical_name, Path(avatar_path))
         click.echo(f"Avatar set for user '{canonical_name}'")
@@ -88,7 +88,8 @@ def set_avatar(canonical_name: str, avatar_path: str):
         sys.exit(1)
 
 @users.command()
-def list():
+@click.pass_obj
+def list(user_manager: UserManager):
     """List all user mappings."""
     mappings = user_manager.get_all_users()
     
@@ -1,16 +1,255 @@
 from datetime import datetime
+import logging
 import os
 import subprocess
 from pathlib import Path
-from typing import List, Optional, Dict, Tuple
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 import tempfile
 import shutil
+import threading
 import warnings
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 
-# Add this import at the top of the file with the other imports
-from .platform_utils import get_platform_specific_path, run_command, convert_to_timestamp
+from .platform_utils import convert_to_timestamp
 from .user_manager import UserManager
 
+logger = logging.getLogger(__name__)
+
+# Buffer size for reading and writing Gource logs
+_BUFFER_SIZE = 1024 * 1024
+
+# Maximum number of repositories processed concurrently
+_MAX_WORKERS = 8
+
+
+def _drain_stream(stream: IO[bytes], lines: Deque[bytes]) -> None:
+    """
+    Read a process output stream until EOF, keeping the most recent lines.
+
+    Args:
+        stream: Binary stream to read
+        lines: Bounded deque that receives the lines read
+    """
+    with stream:
+        for line in iter(stream.readline, b""):
+            lines.append(line)
+
+
+def _find_git_repos(path: Path) -> List[Path]:
+    """
+    Find the Git repositories at or below a directory.
+
+    Args:
+        path: Directory that is, or contains, Git repositories
+
+    Returns:
+        List of repository root paths
+    """
+    repos = []
+    stack = [str(path)]
+    while stack:
+        directory = stack.pop()
+        subdirectories: List[str] = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name == ".git":
+                        # Don't descend into the working tree of a repository
+                        repos.append(Path(directory))
+                        subdirectories = []
+                        break
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+        except OSError:
+            continue
+        stack.extend(subdirectories)
+    return sorted(repos)
+
+
+def _iter_gource_log(repo_path: Path) -> Iterator[bytes]:
+    """
+    Stream the history of a repository as Gource custom log lines.
+
+    The output of git log is read line by line as it is produced, so the
+    unfiltered log never needs to be held in memory or written to disk.
+
+    Args:
+        repo_path: Path to the Git repository
+
+    Yields:
+        Encoded lines in Gource's custom log format: timestamp|author|action|path
+
+    Raises:
+        RuntimeError: If git cannot be run or exits with an error
+    """
+    # Use git log directly to generate the custom log format that Gource expects
+    git_cmd = [
+        "git",
+        "--git-dir", str(repo_path / ".git"),
+        "--work-tree", str(repo_path),
+        "log",
+        "--pretty=format:%at|%aN|%s",
+        "--name-status",
+        "--reverse"
+    ]
+
+    try:
+        process = subprocess.Popen(
+            git_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=str(repo_path),
+            bufsize=_BUFFER_SIZE,
+        )
+    except OSError as e:
+        raise RuntimeError(f"Failed to generate Gource log: {str(e)}") from e
+    assert process.stdout is not None and process.stderr is not None
+
+    # Drain stderr in the background so git never blocks on a full pipe
+    error_lines: Deque[bytes] = deque(maxlen=200)
+    drain = threading.Thread(
+        target=_drain_stream, args=(process.stderr, error_lines), daemon=True
+    )
+
+    with process:
+        drain.start()
+        try:
+            timestamp = None
+            author = None
+
+            for line in process.stdout:
+                line = line.rstrip(b'\n')
+                if not line.strip():
+                    continue
+
+                if b'|' in line:  # This is a commit line
+                    timestamp, author, _ = line.split(b'|', 2)
+                elif line[:1] in (b'A', b'M', b'D'):  # This is a file change line
+                    action, file_path = line.split(b'\t', 1)
+                    # Write in Gource's expected format: timestamp|author|action|path
+                    yield b"%s|%s|%s|/%s\n" % (timestamp, author, action[:1], file_path)
+        finally:
+            # If the log is abandoned early, closing stdout makes git exit,
+            # which also ends the stderr drain
+            process.stdout.close()
+            drain.join()
+
+    if process.returncode != 0:
+        error = b"".join(error_lines).decode(errors="replace")
+        raise RuntimeError(f"Failed to generate Gource log: {error.strip()}")
+
+
+def _filter_lines(
+    lines: Iterable[bytes],
+    start_timestamp: Optional[float] = None,
+    end_timestamp: Optional[float] = None,
+    user_mappings: Optional[Dict[str, str]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Iterator[bytes]:
+    """
+    Filter Gource log lines by date range and map authors to canonical names.
+
+    Args:
+        lines: Encoded lines in Gource's custom log format
+        start_timestamp: Optional Unix timestamp of the start of the range
+        end_timestamp: Optional Unix timestamp of the end of the range
+        user_mappings: Optional mapping from Git usernames to canonical names
+        stats: Optional dictionary that receives statistics about the kept
+            lines once all of them have been consumed
+
+    Yields:
+        The lines that fall inside the range, with authors mapped
+    """
+    if start_timestamp is None:
+        start_timestamp = float('-inf')
+    if end_timestamp is None:
+        end_timestamp = float('inf')
+
+    # Work on the raw bytes so lines never go through a decode/encode cycle
+    encoded_mappings = {
+        git_name.encode(): canonical_name.encode()
+        for git_name, canonical_name in (user_mappings or {}).items()
+    }
+
+    users = set()
+    actions: Counter[bytes] = Counter()
+    total = kept = 0
+    for line in lines:
+        total += 1
+        timestamp, _, rest = line.partition(b'|')
+        try:
+            if not start_timestamp <= float(timestamp) <= end_timestamp:
+                continue
+        except ValueError:
+            # Skip malformed lines
+            continue
+        if encoded_mappings or stats is not None:
+            author, _, change = rest.partition(b'|')
+            author = encoded_mappings.get(author, author)
+            if encoded_mappings:
+                line = b"%s|%s|%s" % (timestamp, author, change)
+            if stats is not None:
+                users.add(author)
+                actions[change[:1]] += 1
+        kept += 1
+        yield line
+
+    if stats is not None:
+        stats.update({
+            'commits': kept,
+            'users': sorted(user.decode(errors="replace") for user in users),
+            'files_modified': actions[b'M'],
+            'files_added': actions[b'A'],
+            'files_deleted': actions[b'D'],
+        })
+    logger.debug(
+        "Kept %d of %d log lines between %s and %s",
+        kept, total, start_timestamp, end_timestamp
+    )
+
+
+def _process_repository(
+    repo_path: Path,
+    filtered_log: Path,
+    start_timestamp: Optional[float] = None,
+    end_timestamp: Optional[float] = None,
+    user_mappings: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[Path], Dict[str, Any]]:
+    """
+    Generate the filtered Gource log for a single repository.
+
+    The git log output is filtered as it streams in and only the filtered
+    log is written. Statistics about the repository are gathered in the
+    same pass.
+
+    Args:
+        repo_path: Path to the Git repository
+        filtered_log: Path of the log file to write, unique to this repository
+        start_timestamp: Optional Unix timestamp of the start of the range
+        end_timestamp: Optional Unix timestamp of the end of the range
+        user_mappings: Optional mapping from Git usernames to canonical names
+
+    Returns:
+        Tuple of the path to the filtered log file, or None if it is empty,
+        and the repository statistics
+    """
+    stats: Dict[str, Any] = {}
+    with filtered_log.open('wb', buffering=_BUFFER_SIZE) as output_file:
+        output_file.writelines(
+            _filter_lines(
+                _iter_gource_log(repo_path),
+                start_timestamp,
+                end_timestamp,
+                user_mappings,
+                stats,
+            )
+        )
+    if filtered_log.stat().st_size == 0:
+        return None, stats
+    return filtered_log, stats
+
+
 class GitVizProcessor:
     def __init__(
         self,
@@ -53,9 +292,12 @@ class GitVizProcessor:
 
         self.start_date = start_date
         self.end_date = end_date
+        self._start_timestamp = convert_to_timestamp(start_date) if start_date else None
+        self._end_timestamp = convert_to_timestamp(end_date) if end_date else None
         self.output_file = output_file
         self.user_manager = user_manager or UserManager(config_dir=config_dir, data_dir=data_dir)
         self.temp_dir = Path(tempfile.mkdtemp())
+        self._stats_cache: Dict[str, Dict[str, Any]] = {}
 
     def __enter__(self):
         return self
@@ -64,90 +306,6 @@ class GitVizProcessor:
         """Clean up temporary files on exit."""
         shutil.rmtree(self.temp_dir)
 
-    def _generate_gource_log(self, repo_path: Path) -> Path:
-        """
-        Generate a Gource log file for a single repository.
-        
-        Args:
-            repo_path: Path to the Git repository
-            
-        Returns:
-            Path to the generated log file
-        """
-        log_file = self.temp_dir / f"{repo_path.name}.log"
-        
-        # Use git log directly to generate the custom log format that Gource expects
-        git_cmd = [
-            "git",
-            "--git-dir", str(repo_path / ".git"),
-            "--work-tree", str(repo_path),
-            "log",
-            "--pretty=format:%at|%aN|%s",
-            "--name-status",
-            "--reverse"
-        ]
-        
-        try:
-            # Run git log and process its output
-            result = run_command(
-                command=git_cmd,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=str(repo_path)
-            )
-            
-            with log_file.open('w') as f:
-                timestamp = None
-                author = None
-                
-                for line in result.stdout.decode().split('\n'):
-                    if not line.strip():
-                        continue
-                        
-                    if '|' in line:  # This is a commit line
-                        timestamp, author, _ = line.split('|')
-                    elif line[0] in 'AMD':  # This is a file change line
-                        action, file_path = line.split('\t')
-                        # Convert git actions to Gource format (A=A, M=M, D=D)
-                        gource_action = action[0]
-                        # Write in Gource's expected format: timestamp|author|action|path
-                        f.write(f"{timestamp}|{author}|{gource_action}|{file_path}\n")
-            
-            return log_file
-        except Exception as e:
-            raise RuntimeError(f"Failed to generate Gource log: {str(e)}")
-        
-    def _filter_log_by_date(self, log_file: Path, repo_name: str) -> Path:
-        """Filter Gource log by date range."""
-        filtered_log = self.temp_dir / f"{repo_name}_filtered.log"
-        
-        # If no date filtering is needed, return the original log
-        if not self.start_date and not self.end_date:
-            return log_file
-        
-        start_timestamp = convert_to_timestamp(self.start_date) if self.start_date else float('-inf')
-        end_timestamp = convert_to_timestamp(self.end_date) if self.end_date else float('inf')
-        
-        # Add debug logging
-        print(f"Debug: Filtering between {start_timestamp} and {end_timestamp}")
-        
-        with log_file.open('r') as input_file, filtered_log.open('w') as output_file:
-            for line in input_file:
-                try:
-                    timestamp = float(line.split('|')[0])  # Change to float for more precise comparison
-                    # Add debug logging
-                    print(f"Debug: Checking timestamp {timestamp}")
-                    if start_timestamp <= timestamp <= end_timestamp:
-                        output_file.write(line)
-                    else:
-                        print(f"Debug: Timestamp {timestamp} outside range {start_timestamp}-{end_timestamp}")
-                except (ValueError, IndexError) as e:
-                    print(f"Debug: Error processing line: {line.strip()} - {str(e)}")
-                    continue
-        
-        return filtered_log
-
     def _combine_logs(self, log_files: List[Path], output_file: Path) -> None:
         """
         Combine multiple Gource log files into a single file.
@@ -156,11 +314,11 @@ class GitVizProcessor:
             log_files: List of paths to log files to combine
             output_file: Path where the combined log will be written
         """
-        with output_file.open('w') as outfile:
+        with output_file.open('wb') as outfile:
             for log_file in log_files:
                 if log_file.exists():
-                    with log_file.open('r') as infile:
-                        outfile.write(infile.read())
+                    with log_file.open('rb') as infile:
+                        shutil.copyfileobj(infile, outfile, _BUFFER_SIZE)
                     
     def process_repositories(self, repository_paths: List[str]) -> None:
         """
@@ -179,7 +337,9 @@ class GitVizProcessor:
         valid_logs = []
         any_repos_attempted = False
 
-        # Process each repository
+        # Collect the repositories to process, keyed by a name that is unique
+        # even when repositories in different directories share a basename
+        repos: Dict[str, Path] = {}
         for repo_path in repository_paths:
             repo = Path(repo_path)
             if not repo.exists():
@@ -187,16 +347,48 @@ class GitVizProcessor:
                 continue
 
             any_repos_attempted = True
+            found = _find_git_repos(repo)
+            if not found:
+                warnings.warn(f"No Git repositories found in {repo_path}")
+            base = repo.resolve().parent
+            for found_repo in found:
+                # Name the repository by its path from the directory given,
+                # e.g. "code/a/utils", or just "utils" if it was given directly
+                key = found_repo.resolve().relative_to(base).as_posix()
+                if key in repos:
+                    key = str(found_repo.resolve())
+                repos[key] = found_repo
+
+        # Resolve canonical names once for all repositories
+        user_mappings = self.user_manager.get_canonical_names()
+        # Each repository writes its own log file, so that repositories which
+        # share a basename never write to the same file
+        tasks = [
+            (
+                repo,
+                self.temp_dir / f"{index}_{repo.name}_filtered.log",
+                self._start_timestamp,
+                self._end_timestamp,
+                user_mappings,
+            )
+            for index, repo in enumerate(repos.values())
+        ]
+
+        # Process repositories in parallel. Most of the time is spent waiting
+        # on git, which releases the GIL, so threads are enough.
+        max_workers = max(1, min(_MAX_WORKERS, os.cpu_count() or 1, len(tasks)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_process_repository, *task) for task in tasks]
+
+        for key, task, future in zip(repos, tasks, futures):
             try:
-                # Generate and validate the log file
-                log_file = self._generate_gource_log(repo)
-                if log_file.exists() and log_file.stat().st_size > 0:
-                    # Filter the log file by date if needed
-                    filtered_log = self._filter_log_by_date(log_file, repo.name)
-                    if filtered_log.exists() and filtered_log.stat().st_size > 0:
-                        valid_logs.append(filtered_log)
+                filtered_log, stats = future.result()
             except Exception as e:
-                warnings.warn(f"Error processing repository {repo_path}: {str(e)}")
+                warnings.warn(f"Error processing repository {task[0]}: {str(e)}")
+                continue
+            self._stats_cache[key] = stats
+            if filtered_log is not None:
+                valid_logs.append(filtered_log)
 
         # Handle results
         if valid_logs:
@@ -256,74 +448,69 @@ class GitVizProcessor:
         if not work_dir.exists():
             work_dir.mkdir(parents=True)
 
-        # Run Gource with explicit working directory
-        gource_process = subprocess.Popen(
-            gource_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=str(work_dir) 
-        )
-
-
-        # Add error checking for Gource process
-        gource_error = gource_process.stderr.read()
-        if gource_process.poll() is not None and gource_process.returncode != 0:
-            raise RuntimeError(f"Gource failed: {gource_error.decode()}")
-
-        ffmpeg_process = subprocess.Popen(
-            ffmpeg_cmd, stdin=gource_process.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
+        # Connect Gource's stdout directly to FFmpeg's stdin through an OS pipe
+        read_fd, write_fd = os.pipe()
+        try:
+            ffmpeg_process = subprocess.Popen(
+                ffmpeg_cmd, stdin=read_fd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            try:
+                # Run Gource with explicit working directory
+                gource_process = subprocess.Popen(
+                    gource_cmd,
+                    stdout=write_fd,
+                    stderr=subprocess.PIPE,
+                    cwd=str(work_dir)
+                )
+            except Exception:
+                ffmpeg_process.kill()
+                ffmpeg_process.wait()
+                raise
+        finally:
+            # Only the child processes should hold the pipe ends, so that
+            # FFmpeg sees EOF as soon as Gource exits
+            os.close(read_fd)
+            os.close(write_fd)
 
-        # Close gource's stdout to signal EOF to ffmpeg
-        if gource_process.stdout:
-            gource_process.stdout.close()
+        # Drain stderr in the background so neither process blocks on it
+        gource_error: Deque[bytes] = deque(maxlen=200)
+        ffmpeg_error: Deque[bytes] = deque(maxlen=200)
+        drains = [
+            threading.Thread(
+                target=_drain_stream, args=(gource_process.stderr, gource_error), daemon=True
+            ),
+            threading.Thread(
+                target=_drain_stream, args=(ffmpeg_process.stderr, ffmpeg_error), daemon=True
+            ),
+        ]
+        for drain in drains:
+            drain.start()
 
-        # Wait for completion and capture output
-        ffmpeg_output, ffmpeg_error = ffmpeg_process.communicate()
+        # Wait for completion
+        ffmpeg_process.wait()
         gource_process.wait()
+        for drain in drains:
+            drain.join()
 
         # Check both process return codes
         if gource_process.returncode != 0:
-            error_msg = gource_error.decode() if gource_error else "Unknown Gource error"
+            error_msg = b"".join(gource_error).decode(errors="replace") or "Unknown Gource error"
             raise RuntimeError(f"Failed to generate visualization (Gource): {error_msg}")
     
         if ffmpeg_process.returncode != 0:
-            error_msg = ffmpeg_error.decode() if ffmpeg_error else "Unknown FFmpeg error"
-            raise RuntimeError(f"Failed to generate visualization (FFmpeg): {error_msg}")        
+            error_msg = b"".join(ffmpeg_error).decode(errors="replace") or "Unknown FFmpeg error"
+            raise RuntimeError(f"Failed to generate visualization (FFmpeg): {error_msg}")
 
     def get_repository_stats(self) -> Dict[str, Dict]:
         """
         Get statistics about processed repositories.
         
+        The statistics are gathered while the repository logs are filtered,
+        so no log is read a second time.
+        
         Returns:
-            Dictionary containing repository statistics
+            Dictionary containing repository statistics, keyed by each
+            repository's path relative to the parent of the directory it
+            was found in (just its name when it was given directly)
         """
-        stats = {}
-        for log_file in self.temp_dir.glob("*.filtered.log"):
-            repo_stats = {
-                'commits': 0,
-                'users': set(),
-                'files_modified': 0,
-                'files_added': 0,
-                'files_deleted': 0
-            }
-            
-            with open(log_file, 'r') as f:
-                for line in f:
-                    _, user, action, _ = line.strip().split('|')
-                    repo_stats['users'].add(user)
-                    
-                    if action == 'M':
-                        repo_stats['files_modified'] += 1
-                    elif action == 'A':
-                        repo_stats['files_added'] += 1
-                    elif action == 'D':
-                        repo_stats['files_deleted'] += 1
-                        
-                    repo_stats['commits'] += 1
-            
-            repo_stats['users'] = list(repo_stats['users'])
-            stats[log_file.stem.replace('.filtered', '')] = repo_stats
-            
-        return stats
-    
+        return dict(self._stats_cache)
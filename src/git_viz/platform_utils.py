@@ -1,9 +1,12 @@
 import platform
 import subprocess
 from pathlib import Path
-from typing import List, Union, Optional
+from typing import Iterable, List, Union, Optional
 import shutil
 import os
+from functools import lru_cache
+
+_IS_WINDOWS = platform.system() == 'Windows'
 
 def get_platform_specific_path(path: Union[str, Path]) -> Path:
     """Convert a path to the platform-specific format."""
@@ -33,6 +36,9 @@ def run_command(
     """
     Run a command with platform-specific adjustments.
     
+    No preexec_fn is passed, so on POSIX systems subprocess can use its
+    vfork/posix_spawn fast path instead of a full fork.
+    
     Args:
         command: Command and arguments as list
         check: Whether to check return code
@@ -43,24 +49,27 @@ def run_command(
     Returns:
         CompletedProcess instance
     """
+    command = list(command)
+    creation_flags = 0
+    
     # On Windows, ensure we use the correct executable names
-    if platform.system() == 'Windows':
+    if _IS_WINDOWS:
         if command[0] == 'gource':
             command[0] = 'gource.exe'
         elif command[0] == 'ffmpeg':
             command[0] = 'ffmpeg.exe'
+        # Prevent a console window from opening
+        creation_flags = subprocess.CREATE_NO_WINDOW
     
     try:
-        # Set creation flags for Windows to prevent console window
-        creation_flags = subprocess.CREATE_NO_WINDOW if platform.system() == 'Windows' else 0
-        
         return subprocess.run(
             command,
             check=check,
             stdout=stdout,
             stderr=stderr,
             cwd=cwd,
-            creationflags=creation_flags if platform.system() == 'Windows' else 0
+            close_fds=True,
+            creationflags=creation_flags
         )
     except FileNotFoundError as e:
         raise RuntimeError(f"Command not found: {command[0]}") from e
@@ -74,6 +83,7 @@ def get_timestamp_format() -> str:
     else:  # Linux and Windows
         return "%Y-%m-%d"
 
+@lru_cache(maxsize=64)
 def convert_to_timestamp(date_str: str) -> int:
     """
     Convert a date string to Unix timestamp in a platform-independent way.
@@ -92,6 +102,20 @@ def convert_to_timestamp(date_str: str) -> int:
     except ValueError as e:
         raise ValueError(f"Invalid date format. Please use YYYY-MM-DD: {e}")
 
+def convert_to_timestamps(date_strs: Iterable[str]) -> List[int]:
+    """
+    Convert several date strings to Unix timestamps.
+    
+    Repeated dates are only parsed once, via the convert_to_timestamp cache.
+    
+    Args:
+        date_strs: Date strings in YYYY-MM-DD format
+    
+    Returns:
+        Unix timestamps as integers, in the same order as the input
+    """
+    return [convert_to_timestamp(date_str) for date_str in date_strs]
+
 def ensure_directory(path: Union[str, Path]) -> Path:
     """
     Ensure a directory exists and create it if it doesn't.
@@ -1,21 +1,22 @@
 from pathlib import Path
 import yaml
-from typing import Dict, Optional, List
+from typing import Dict, Iterator, Optional, List, Tuple
 import shutil
 from platformdirs import user_config_dir, user_data_dir
 import hashlib
-from PIL import Image
 import os
+from collections import defaultdict
+from contextlib import contextmanager
 
-class UserManager:
-    _instance = None
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
+try:
+    from yaml import CSafeDumper as _YamlDumper, CSafeLoader as _YamlLoader
+except ImportError:  # pragma: no cover - libyaml is not available
+    from yaml import (  # type: ignore[assignment]
+        SafeDumper as _YamlDumper,
+        SafeLoader as _YamlLoader,
+    )
 
+class UserManager:
     def __init__(self, config_dir: Optional[Path] = None, data_dir: Optional[Path] = None):
         """Initialize UserManager with optional custom config and data directories.
         
@@ -23,63 +24,94 @@ class UserManager:
             config_dir: Optional custom config directory. If None, uses platformdirs.
             data_dir: Optional custom data directory. If None, uses platformdirs.
         """
-        if (config_dir is not None or data_dir is not None) and self._initialized:
-            self._initialized = False
-            
-        if not self._initialized:
-            self.app_name = "git-viz"
-            
-            # Set config directory
-            if config_dir is not None:
-                self.config_dir = Path(config_dir)
-            else:
-                self.config_dir = Path(user_config_dir(self.app_name))
-                
-            # Set data directory
-            if data_dir is not None:
-                self.data_dir = Path(data_dir)
-            else:
-                self.data_dir = Path(user_data_dir(self.app_name))
-                
-            self.avatar_dir = self.data_dir / "avatars"
-            self.config_file = self.config_dir / "users.yaml"
+        self.app_name = "git-viz"
+        
+        # Set config directory
+        if config_dir is not None:
+            self.config_dir = Path(config_dir)
+        else:
+            self.config_dir = Path(user_config_dir(self.app_name))
             
-            # Create necessary directories
-            self.config_dir.mkdir(parents=True, exist_ok=True)
-            self.avatar_dir.mkdir(parents=True, exist_ok=True)
+        # Set data directory
+        if data_dir is not None:
+            self.data_dir = Path(data_dir)
+        else:
+            self.data_dir = Path(user_data_dir(self.app_name))
             
-            # Load or create user mappings
-            self._load_user_mappings()
-            self._initialized = True
+        self.avatar_dir = self.data_dir / "avatars"
+        self.config_file = self.config_dir / "users.yaml"
+        
+        # Create necessary directories
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        self.avatar_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Saves are deferred while a batch of changes is in progress
+        self._batch_depth = 0
+        self._dirty = False
+        
+        # Load or create user mappings
+        self._load_user_mappings()
 
     def _load_user_mappings(self) -> None:
         """Load user mappings from config file or create default."""
         if self.config_file.exists():
             with open(self.config_file, 'r') as f:
-                self.user_mappings = yaml.safe_load(f) or {}
+                self.user_mappings = yaml.load(f, Loader=_YamlLoader) or {}
         else:
             self.user_mappings = {}
             self._save_user_mappings()
+        self._build_canonical_index()
+        self._name_keys: Optional[Tuple[List[str], List[str]]] = None
 
-    def _save_user_mappings(self) -> None:
-        """Save user mappings to config file."""
-        with open(self.config_file, 'w') as f:
-            yaml.dump(self.user_mappings, f)
+    def _build_canonical_index(self) -> None:
+        """Build the index from canonical names to their Git usernames."""
+        self._canonical_index: Dict[str, List[str]] = defaultdict(list)
+        for git_name, user_data in self.user_mappings.items():
+            self._canonical_index[user_data['canonical_name']].append(git_name)
 
-    @classmethod
-    def reset(cls):
-        """Reset the singleton instance for testing purposes."""
-        cls._instance = None
+    def _save_user_mappings(self) -> None:
+        """Save user mappings to config file, unless a batch is in progress."""
+        if self._batch_depth > 0:
+            self._dirty = True
+            return
+        
+        # Write to a temporary file first so a crash can't truncate the config
+        temp_file = self.config_file.with_name(f"{self.config_file.name}.tmp")
+        with open(temp_file, 'w') as f:
+            yaml.dump(self.user_mappings, f, Dumper=_YamlDumper)
+        os.replace(temp_file, self.config_file)
+        self._dirty = False
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Defer saving user mappings until the outermost batch exits.
+        
+        Use this when making many changes at once, so the config file is
+        written once rather than after every change.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self._save_user_mappings()
 
     def add_user_mapping(self, git_name: str, canonical_name: str) -> None:
         """Add a mapping between a Git username and canonical name."""
         if git_name not in self.user_mappings:
+            self._name_keys = None
             self.user_mappings[git_name] = {
                 'canonical_name': canonical_name,
                 'avatar': None
             }
         else:
+            previous_name = self.user_mappings[git_name]['canonical_name']
+            if git_name in self._canonical_index.get(previous_name, ()):
+                self._canonical_index[previous_name].remove(git_name)
             self.user_mappings[git_name]['canonical_name'] = canonical_name
+        if git_name not in self._canonical_index[canonical_name]:
+            self._canonical_index[canonical_name].append(git_name)
         self._save_user_mappings()
 
     def get_canonical_name(self, git_name: str) -> str:
@@ -88,35 +120,58 @@ class UserManager:
             return self.user_mappings[git_name]['canonical_name']
         return git_name
 
+    def get_canonical_names(self) -> Dict[str, str]:
+        """Get a mapping from each mapped Git username to its canonical name."""
+        return {
+            git_name: user_data['canonical_name']
+            for git_name, user_data in self.user_mappings.items()
+        }
+
     def set_user_avatar(self, canonical_name: str, avatar_path: Path) -> None:
         """Set an avatar for a user and process it for Gource."""
+        from PIL import Image
+
         if not avatar_path.exists():
             raise FileNotFoundError(f"Avatar file not found: {avatar_path}")
 
         # Generate a unique filename based on the canonical name
-        avatar_hash = hashlib.md5(canonical_name.encode()).hexdigest()
+        avatar_hash = hashlib.blake2b(canonical_name.encode(), digest_size=16).hexdigest()
         new_avatar_path = self.avatar_dir / f"{avatar_hash}.png"
 
-        # Process and save the avatar
-        with Image.open(avatar_path) as img:
-            # Resize to Gource's preferred size (maintaining aspect ratio)
-            max_size = (128, 128)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Create a square image with padding if necessary
-            square_size = max(img.size)
-            new_img = Image.new('RGBA', (square_size, square_size), (0, 0, 0, 0))
-            paste_pos = ((square_size - img.size[0]) // 2,
-                        (square_size - img.size[1]) // 2)
-            new_img.paste(img, paste_pos)
-            
-            # Save the processed avatar
-            new_img.save(new_avatar_path, 'PNG')
+        # Skip reprocessing if this exact image has already been processed
+        source_hash = hashlib.blake2b(avatar_path.read_bytes(), digest_size=16).hexdigest()
+        source_hash_path = new_avatar_path.with_name(f"{new_avatar_path.name}.src")
+        if not (
+            new_avatar_path.exists()
+            and source_hash_path.exists()
+            and source_hash_path.read_text() == source_hash
+        ):
+            # Process and save the avatar
+            with Image.open(avatar_path) as img:
+                # Resize to Gource's preferred size (maintaining aspect ratio),
+                # letting Pillow reduce large images before resampling
+                scale = min(1.0, 128 / img.width, 128 / img.height)
+                new_size = (max(1, round(img.width * scale)),
+                            max(1, round(img.height * scale)))
+                resized = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+                
+                # Create a square image with padding if necessary
+                if resized.width == resized.height:
+                    new_img = resized.convert('RGBA')
+                else:
+                    square_size = max(resized.size)
+                    new_img = Image.new('RGBA', (square_size, square_size), (0, 0, 0, 0))
+                    paste_pos = ((square_size - resized.width) // 2,
+                                (square_size - resized.height) // 2)
+                    new_img.paste(resized, paste_pos)
+                
+                # Save the processed avatar
+                new_img.save(new_avatar_path, 'PNG')
+            source_hash_path.write_text(source_hash)
 
         # Update user mappings
-        for user_data in self.user_mappings.values():
-            if user_data['canonical_name'] == canonical_name:
-                user_data['avatar'] = str(new_avatar_path)
+        for git_name in self._canonical_index.get(canonical_name, ()):
+            self.user_mappings[git_name]['avatar'] = str(new_avatar_path)
         self._save_user_mappings()
 
     def get_avatar_dir(self) -> Path:
@@ -129,14 +184,18 @@ class UserManager:
 
     def suggest_similar_users(self, git_name: str) -> List[str]:
         """Suggest similar usernames based on string similarity."""
-        from difflib import SequenceMatcher
-
-        def similarity(a: str, b: str) -> float:
-            return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-        similar_users = []
-        for existing_name in self.user_mappings.keys():
-            if similarity(git_name, existing_name) > 0.6:  # Threshold for similarity
-                similar_users.append(existing_name)
-
-        return similar_users
+        from rapidfuzz import fuzz, process
+
+        if self._name_keys is None or len(self._name_keys[0]) != len(self.user_mappings):
+            names = list(self.user_mappings)
+            self._name_keys = (names, [name.lower() for name in names])
+        names, lowered_names = self._name_keys
+
+        matches = process.extract(
+            git_name.lower(),
+            lowered_names,
+            scorer=fuzz.ratio,
+            score_cutoff=60,  # Threshold for similarity
+            limit=None,
+        )
+        return [names[index] for _, _, index in matches]
@@ -1,130 +1,56 @@
 """Test suite for git-viz package."""
-import pytest
-import tempfile
-import os
+import subprocess
 from pathlib import Path
-import shutil
-from contextlib import contextmanager
 
-@pytest.fixture(scope="session")
-def test_data_dir():
-    """Create a temporary directory for test data that persists across all tests."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        yield Path(temp_dir)
-
-@pytest.fixture
-def sample_image(test_data_dir):
-    """Create a sample image for avatar testing."""
-    from PIL import Image
-    
-    image_path = test_data_dir / "sample_avatar.png"
-    img = Image.new('RGB', (200, 200), color='red')
-    img.save(image_path)
-    return image_path
-
-@contextmanager
-def create_git_repo():
-    """Create a temporary Git repository with some sample commits."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        repo_dir = Path(temp_dir)
-        
-        # Initialize git repo
-        os.chdir(repo_dir)
-        os.system("git init")
-        
-        # Configure git user
-        os.system('git config user.email "test@example.com"')
-        os.system('git config user.name "Test User"')
-        
-        # Create some test files and commits
-        for i in range(3):
-            file_path = repo_dir / f"file{i}.txt"
-            file_path.write_text(f"Content {i}")
-            os.system(f"git add {file_path}")
-            os.system(f'git commit -m "Add file {i}"')
-        
-        yield repo_dir
-
-@pytest.fixture
-def git_repo():
-    """Fixture that provides a temporary Git repository."""
-    with create_git_repo() as repo:
-        yield repo
-
-@pytest.fixture
-def clean_env():
-    """Fixture to provide a clean environment by temporarily clearing certain env vars."""
-    # Save current environment variables
-    saved_vars = {}
-    vars_to_clear = ['GIT_AUTHOR_NAME', 'GIT_AUTHOR_EMAIL', 
-                     'GIT_COMMITTER_NAME', 'GIT_COMMITTER_EMAIL']
-    
-    for var in vars_to_clear:
-        if var in os.environ:
-            saved_vars[var] = os.environ[var]
-            del os.environ[var]
-    
-    yield
-    
-    # Restore environment variables
-    for var, value in saved_vars.items():
-        os.environ[var] = value
-
-@pytest.fixture
-def mock_dependencies(monkeypatch):
-    """Mock external dependencies for testing."""
-    def mock_which(cmd):
-        return f"/usr/bin/{cmd}"
-    
-    monkeypatch.setattr(shutil, 'which', mock_which)
-    yield
-
-def pytest_configure(config):
-    """Configure pytest with custom markers."""
-    config.addinivalue_line(
-        "markers",
-        "integration: mark test as integration test"
-    )
-    config.addinivalue_line(
-        "markers",
-        "requires_gource: mark test as requiring Gource installation"
-    )
-    config.addinivalue_line(
-        "markers",
-        "requires_ffmpeg: mark test as requiring FFmpeg installation"
+# A valid 1x1 red PNG, so fixtures can write images without importing Pillow
+RED_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010802000000907753"
+    "de0000000c49444154789c63f8cfc0000003010100c9fe92ef0000000049454e"
+    "44ae426082"
+)
+
+# A valid 200x200 red (palette) PNG, larger than Gource's avatar size
+RED_PNG_200X200 = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000c8000000c8010300000097963c"
+    "dd00000003504c5445ff000019e209370000001c4944415478daedc181000000"
+    "00c3a0f9535fe1005501000000007c0614500001c45ae62b0000000049454e44"
+    "ae426082"
+)
+
+# The users.yaml a UserManager writes when it starts with no mappings
+BLANK_CONFIG_YAML = b"{}\n"
+
+def run_git(*args, cwd, input=None):
+    """Run a git command without a shell, discarding its output."""
+    subprocess.run(
+        ("git", "-c", "init.defaultBranch=main") + args,
+        cwd=cwd,
+        input=input,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
     )
 
-def pytest_collection_modifyitems(config, items):
-    """Skip integration tests unless explicitly requested."""
-    skip_integration = pytest.mark.skip(reason="need --integration option to run")
-    skip_gource = pytest.mark.skip(reason="Gource not available")
-    skip_ffmpeg = pytest.mark.skip(reason="FFmpeg not available")
-    
-    # Check if integration tests should run
-    run_integration = config.getoption("--integration", default=False)
-    
-    # Check if required tools are available
-    has_gource = shutil.which('gource') is not None
-    has_ffmpeg = shutil.which('ffmpeg') is not None
-    
-    for item in items:
-        # Skip integration tests if not explicitly requested
-        if "integration" in item.keywords and not run_integration:
-            item.add_marker(skip_integration)
-        
-        # Skip tests requiring Gource if not available
-        if "requires_gource" in item.keywords and not has_gource:
-            item.add_marker(skip_gource)
-        
-        # Skip tests requiring FFmpeg if not available
-        if "requires_ffmpeg" in item.keywords and not has_ffmpeg:
-            item.add_marker(skip_ffmpeg)
-
-def pytest_addoption(parser):
-    """Add custom command line options to pytest."""
-    parser.addoption(
-        "--integration",
-        action="store_true",
-        default=False,
-        help="run integration tests"
-    )
\ No newline at end of file
+def import_commits(repo_dir: Path, commits) -> None:
+    """Commit files to a new repository's main branch with one git fast-import.
+    
+    Each commit is a ``(message, filename, content)`` tuple. Commit dates are
+    fixed so the repository's log is the same on every run.
+    """
+    stream = []
+    for i, (message, filename, content) in enumerate(commits):
+        message, content = message.encode(), content.encode()
+        stream += [
+            b"commit refs/heads/main",
+            b"committer Test User <test@example.com> %d +0000" % (1700000000 + i),
+            b"data %d" % len(message),
+            message,
+            b"M 100644 inline " + filename.encode(),
+            b"data %d" % len(content),
+            content,
+            b"",
+        ]
+    run_git("fast-import", "--quiet", cwd=repo_dir, input=b"\n".join(stream))
+    
+    # Check out the imported commits into the working tree
+    run_git("reset", "-q", "--hard", cwd=repo_dir)
@@ -0,0 +1,135 @@
+"""Shared fixtures for the git-viz test suite."""
+import os
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import pytest
+
+from git_viz.user_manager import UserManager
+from tests import BLANK_CONFIG_YAML, RED_PNG, import_commits, run_git
+
+def _use_shared_memory_tempdir():
+    """Keep temporary test files in RAM on Linux, unless TMPDIR is set.
+
+    The directory is per user and is not removed after the run. pytest keeps
+    its base temporary directories from the last three runs with a failing
+    test under it (see ``tmp_path_retention_policy`` in pyproject.toml);
+    delete the directory to free that memory.
+    """
+    shm_dir = Path("/dev/shm")
+    if sys.platform != "linux" or "TMPDIR" in os.environ or not shm_dir.is_dir():
+        return
+    test_dir = shm_dir / f"git_viz_tests-{os.getuid()}"
+    try:
+        test_dir.mkdir(mode=0o700, exist_ok=True)
+    except OSError:
+        return
+    if os.access(test_dir, os.W_OK):
+        # tmp_path, tmp_path_factory and tempfile.mkdtemp all use this directory
+        tempfile.tempdir = str(test_dir)
+
+_use_shared_memory_tempdir()
+
+@pytest.fixture(scope="session")
+def temp_git_repo(tmp_path_factory):
+    """Create a Git repository once for the whole test session.
+
+    Tests must not modify this repository; use ``fresh_git_repo`` for that.
+    """
+    repo_dir = tmp_path_factory.mktemp("repos") / "test_repo"
+    repo_dir.mkdir()
+
+    # Initialize git repo and commit a test file
+    run_git("init", "-q", cwd=repo_dir)
+    import_commits(repo_dir, [("Initial commit", "test.txt", "Initial content")])
+
+    return repo_dir
+
+@pytest.fixture
+def fresh_git_repo(temp_git_repo, tmp_path):
+    """Provide a private clone of the session repository that a test may modify."""
+    repo_dir = tmp_path / temp_git_repo.name
+    # A local clone hardlinks the object store instead of copying it
+    run_git("clone", "--local", "--quiet", str(temp_git_repo), str(repo_dir), cwd=tmp_path)
+    return repo_dir
+
+@pytest.fixture(scope="session")
+def red_avatar(tmp_path_factory):
+    """Create a small avatar image once for the whole test session."""
+    avatar_path = tmp_path_factory.mktemp("images") / "red_avatar.png"
+    avatar_path.write_bytes(RED_PNG)
+    return avatar_path
+
+@pytest.fixture(scope="session")
+def pil_image():
+    """Import Pillow's Image module once, skipping tests if Pillow is missing."""
+    return pytest.importorskip("PIL.Image")
+
+@pytest.fixture(scope="module")
+def module_user_manager(tmp_path_factory):
+    """Create one isolated UserManager for all tests in a module."""
+    base_dir = tmp_path_factory.mktemp("um")
+    return UserManager(config_dir=base_dir / "config", data_dir=base_dir / "data")
+
+@pytest.fixture
+def user_manager(module_user_manager):
+    """Provide the module's UserManager with empty user mappings and no avatars.
+
+    CLI tests pass it to ``runner.invoke`` as ``obj`` so the CLI uses it.
+    """
+    # Reset the shared manager in place rather than rebuilding its directories
+    for avatar in module_user_manager.avatar_dir.iterdir():
+        avatar.unlink()
+    module_user_manager.config_file.write_bytes(BLANK_CONFIG_YAML)
+    module_user_manager._load_user_mappings()
+    return module_user_manager
+
+@lru_cache(maxsize=None)
+def _has_tool(name):
+    """Check once per session whether an external tool is on the PATH."""
+    return shutil.which(name) is not None
+
+def pytest_addoption(parser):
+    """Add custom command line options to pytest."""
+    parser.addoption(
+        "--integration",
+        action="store_true",
+        default=False,
+        help="run integration tests"
+    )
+
+def pytest_configure(config):
+    """Configure pytest with custom markers."""
+    config.addinivalue_line(
+        "markers",
+        "integration: mark test as integration test"
+    )
+    config.addinivalue_line(
+        "markers",
+        "requires_gource: mark test as requiring Gource installation"
+    )
+    config.addinivalue_line(
+        "markers",
+        "requires_ffmpeg: mark test as requiring FFmpeg installation"
+    )
+
+def pytest_collection_modifyitems(config, items):
+    """Skip integration tests unless explicitly requested."""
+    # Work out once which markers lead to a skip, and why
+    skips = {}
+    if not config.getoption("--integration", default=False):
+        skips["integration"] = pytest.mark.skip(reason="need --integration option to run")
+    if not _has_tool("gource"):
+        skips["requires_gource"] = pytest.mark.skip(reason="Gource not available")
+    if not _has_tool("ffmpeg"):
+        skips["requires_ffmpeg"] = pytest.mark.skip(reason="FFmpeg not available")
+    if not skips:
+        return
+    
+    for item in items:
+        marker_names = {marker.name for marker in item.iter_markers()}
+        for name in marker_names & skips.keys():
+            item.add_marker(skips[name])
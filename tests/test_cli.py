@@ -1,46 +1,18 @@
 import pytest
 from click.testing import CliRunner
 from pathlib import Path
-import tempfile
+import shutil
 from git_viz.cli import cli
-from git_viz.user_manager import UserManager
 
-import os
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def runner():
-    """Create a CLI test runner."""
-    return CliRunner()
+    """Create a CLI test runner shared by all tests.
 
-@pytest.fixture
-def temp_git_repo():
-    """Create a temporary Git repository for testing."""
-    original_dir = os.getcwd()  # Store original directory
-    with tempfile.TemporaryDirectory() as temp_dir:
-        repo_dir = Path(temp_dir) / "test_repo"
-        repo_dir.mkdir()
-        
-        try:
-            # Initialize git repo
-            os.chdir(repo_dir)
-            os.system("git init")
-            os.system('git config user.email "test@example.com"')
-            os.system('git config user.name "Test User"')
-            
-            # Create a test file and commit it
-            test_file = repo_dir / "test.txt"
-            test_file.write_text("Test content")
-            os.system("git add test.txt")
-            os.system('git commit -m "Initial commit"')
-            
-            yield repo_dir
-            
-        finally:
-            # Restore original directory before cleanup
-            os.chdir(original_dir)
-            # Force garbage collection to release file handles
-            import gc
-            gc.collect()
+    CliRunner keeps no state between invocations; tests that touch files
+    use ``runner.isolated_filesystem()`` for isolation.
+    """
+    return CliRunner()
 
 def test_cli_version(runner):
     """Test the --version flag."""
@@ -48,8 +20,10 @@ def test_cli_version(runner):
     assert result.exit_code == 0
     assert "git-viz" in result.output
 
-def test_visualize_command_no_args(runner):
+def test_visualize_command_no_args(runner, mocker):
     """Test visualize command with no arguments."""
+    # Gource and FFmpeg are checked first; pretend they are installed
+    mocker.patch('git_viz.cli.check_dependencies', return_value=[])
     result = runner.invoke(cli, ["visualize"])
     assert result.exit_code != 0
     assert "Error: Please specify at least one directory" in result.output
@@ -63,7 +37,6 @@ def test_visualize_command_valid_path(runner, temp_git_repo, mocker):
     """Test visualize command logic with valid repository path."""
     # Mock all external dependencies
     mocker.patch('git_viz.cli.check_dependencies', return_value=[])
-    mocker.patch('git_viz.core.run_command')  # Mock the run_command function
     mocker.patch('subprocess.Popen')  # Mock subprocess calls
     
     mock_processor = mocker.MagicMock()
@@ -89,123 +62,87 @@ def test_visualize_command_valid_path(runner, temp_git_repo, mocker):
         # Assert process_repositories was called with the correct path
         mock_processor.process_repositories.assert_called_once_with([str(temp_git_repo)])
 
-def test_users_map_command(runner):
+def test_users_map_command(runner, user_manager):
     """Test user mapping command."""
     with runner.isolated_filesystem():
         # Simulate user input 'y' for the confirmation prompt
         result = runner.invoke(cli, [
             "users", "map",
             "test.user", "Test User"
-        ], input='y\n')  # Add this input parameter
+        ], input='y\n', obj=user_manager)
         
         assert result.exit_code == 0
         assert "Mapped 'test.user' to 'Test User'" in result.output
 
-def test_users_map_similar_names(runner):
+def test_users_map_similar_names(runner, seeded_users):
     """Test user mapping with similar existing names."""
     with runner.isolated_filesystem():
-        # First mapping
-        runner.invoke(cli, ["users", "map", "john.doe", "John Doe"])
-        
         # Try similar name
-        result = runner.invoke(cli, ["users", "map", "john.d", "John D"], input="n\n")
+        result = runner.invoke(cli, ["users", "map", "john.d", "John D"],
+                               input="n\n", obj=seeded_users)
         assert result.exit_code == 0
         assert "Similar existing usernames found" in result.output
 
-def test_users_set_avatar_invalid_path(runner):
+def test_users_set_avatar_invalid_path(runner, user_manager):
     """Test setting avatar with invalid path."""
     result = runner.invoke(cli, [
         "users", "set-avatar",
         "Test User", "/nonexistent/avatar.png"
-    ])
+    ], obj=user_manager)
     assert result.exit_code != 0
     assert "Error" in result.output
 
-def test_users_set_avatar_valid_path(runner):
+def test_users_set_avatar_valid_path(runner, red_avatar, seeded_users):
     """Test setting avatar with valid path."""
     with runner.isolated_filesystem():
-        # Create a test image
-        from PIL import Image
+        # Copy in the test image
         avatar_path = Path("test_avatar.png")
-        img = Image.new('RGB', (100, 100), color='red')
-        img.save(avatar_path)
-        
-        # Map user first
-        runner.invoke(cli, ["users", "map", "test.user", "Test User"])
+        shutil.copy(red_avatar, avatar_path)
         
         # Set avatar
         result = runner.invoke(cli, [
             "users", "set-avatar",
-            "Test User", str(avatar_path)
-        ])
+            "John Doe", str(avatar_path)
+        ], obj=seeded_users)
         assert result.exit_code == 0
         assert "Avatar set for user" in result.output
+        assert seeded_users.user_mappings["john.doe"]["avatar"] is not None
 
-def test_users_list_command(runner, mocker):
+def test_users_list_command(runner, user_manager):
     """Test listing users command."""
     with runner.isolated_filesystem():
-        # Reset UserManager singleton and create new instance with empty mappings
-        UserManager._instance = None
-        mock_user_manager = UserManager()
-        mock_user_manager.user_mappings = {}  # Use user_mappings instead of _mappings
-        mocker.patch('git_viz.cli.user_manager', new=mock_user_manager)
-
         # First verify we start with no mappings
-        result = runner.invoke(cli, ["users", "list"])
+        result = runner.invoke(cli, ["users", "list"], obj=user_manager)
+        assert result.exit_code == 0
         assert "No user mappings found" in result.output
 
         # Rest of the test remains the same...
-        result = runner.invoke(cli, ["users", "map", "john.doe", "John Doe"], input='y\n')
+        result = runner.invoke(cli, ["users", "map", "john.doe", "John Doe"], input='y\n',
+                               obj=user_manager)
         assert result.exit_code == 0
         assert "Mapped 'john.doe' to 'John Doe'" in result.output
 
         # Verify first mapping is present
-        result = runner.invoke(cli, ["users", "list"])
+        result = runner.invoke(cli, ["users", "list"], obj=user_manager)
         assert "john.doe -> John Doe" in result.output
 
         # Add second user
-        result = runner.invoke(cli, ["users", "map", "jane.doe", "Jane Doe"], input='y\n')
+        result = runner.invoke(cli, ["users", "map", "jane.doe", "Jane Doe"], input='y\n',
+                               obj=user_manager)
         assert result.exit_code == 0
         assert "Mapped 'jane.doe' to 'Jane Doe'" in result.output
 
         # Final verification
-        result = runner.invoke(cli, ["users", "list"])
+        result = runner.invoke(cli, ["users", "list"], obj=user_manager)
         assert result.exit_code == 0
         assert "User Mappings:" in result.output
         assert "john.doe -> John Doe" in result.output
         assert "jane.doe -> Jane Doe" in result.output
 
-@pytest.fixture(autouse=True)
-def clean_user_mappings(mocker, tmp_path):
-    """Clean up user mappings before each test."""
-    # Use pytest's tmp_path instead of tempfile
-    config_dir = tmp_path / "config"
-    data_dir = tmp_path / "data"
-    config_dir.mkdir()
-    data_dir.mkdir()
-    
-    # Mock the directories
-    mocker.patch('platformdirs.user_config_dir', return_value=str(config_dir))
-    mocker.patch('platformdirs.user_data_dir', return_value=str(data_dir))
-    
-    # Reset UserManager singleton
-    user_manager = UserManager()
-    user_manager._mappings = {}  # Explicitly clear mappings
-    mocker.patch('git_viz.cli.user_manager', new=user_manager)
-    
-    yield
-    
-    # Cleanup
-    UserManager._instance = None
-
-def test_users_list_empty(runner, mocker):
-    """Test listing users when none exist."""
-    # Create a mock user manager instance
-    mock_user_manager = UserManager()
-    mock_user_manager._mappings = {}
-    # Mock the global user_manager instance in the cli module
-    mocker.patch('git_viz.cli.user_manager', return_value=mock_user_manager)
-    
-    result = runner.invoke(cli, ["users", "list"])
-    assert result.exit_code == 0
-    assert "No user mappings found" in result.output
+@pytest.fixture
+def seeded_users(user_manager):
+    """Pre-seed the user manager with mappings, without invoking the CLI."""
+    with user_manager.batch():
+        user_manager.add_user_mapping("john.doe", "John Doe")
+        user_manager.add_user_mapping("jane.doe", "Jane Doe")
+    return user_manager
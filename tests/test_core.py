@@ -1,50 +1,55 @@
+import io
 import pytest
 from pathlib import Path
-import tempfile
 import shutil
-import os
 from datetime import datetime, timedelta
 from git_viz.core import GitVizProcessor
 from git_viz.user_manager import UserManager
+from tests import import_commits, run_git
 
 from unittest.mock import patch, MagicMock
 from pathlib import Path
 
+# Canned git log output in the Gource custom log format
+SAMPLE_LOG_BYTES = b"1700000000|Test User|A|/test.txt\n"
+
+# Dates relative to the start of the test run, formatted once
+_NOW = datetime.now()
+_TOMORROW_STR = (_NOW + timedelta(days=1)).strftime("%Y-%m-%d")
+_NEXT_YEAR_STR = (_NOW + timedelta(days=365)).strftime("%Y-%m-%d")
+
+
+@pytest.fixture(scope="module")
+def module_processor(tmp_path_factory, module_user_manager):
+    """Create one GitVizProcessor instance for all tests in this module."""
+    output_file = tmp_path_factory.mktemp("output") / "output.mp4"
+    processor = GitVizProcessor(
+        start_date="2000-01-01",
+        end_date=_TOMORROW_STR,
+        output_file=str(output_file),
+        user_manager=module_user_manager
+    )
+    yield processor
+    shutil.rmtree(processor.temp_dir, ignore_errors=True)
 
 @pytest.fixture
-def temp_git_repo():
-    """Create a temporary Git repository for testing."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        repo_dir = Path(temp_dir) / "test_repo"
-        repo_dir.mkdir()
-        
-        # Initialize git repo
-        os.chdir(repo_dir)
-        os.system("git init")
-        
-        # Create some test files and commits
-        test_file = repo_dir / "test.txt"
-        test_file.write_text("Initial content")
-        os.system('git config user.email "test@example.com"')
-        os.system('git config user.name "Test User"')
-        os.system("git add test.txt")
-        os.system('git commit -m "Initial commit"')
-        
-        yield repo_dir
+def processor(module_processor):
+    """Provide the shared GitVizProcessor with an empty temporary directory."""
+    # Only log files are written there, so emptying it is cheaper than recreating it
+    for path in module_processor.temp_dir.iterdir():
+        path.unlink()
+    module_processor._stats_cache.clear()
+    return module_processor
 
 @pytest.fixture
-def processor():
-    """Create a GitVizProcessor instance with temporary directories."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        output_file = Path(temp_dir) / "output.mp4"
-        tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-        processor = GitVizProcessor(
-            start_date="2000-01-01",
-            end_date=tomorrow,
-            output_file=str(output_file),
-            user_manager=UserManager()
-        )
-        yield processor
+def processor_cm(tmp_path, module_user_manager):
+    """Create a GitVizProcessor of its own, for tests that enter and exit it."""
+    processor = GitVizProcessor(
+        output_file=str(tmp_path / "output.mp4"),
+        user_manager=module_user_manager
+    )
+    yield processor
+    shutil.rmtree(processor.temp_dir, ignore_errors=True)
 
 def test_processor_initialization(processor):
     """Test GitVizProcessor initialization."""
@@ -52,81 +57,181 @@ def test_processor_initialization(processor):
     assert isinstance(processor.user_manager, UserManager)
     assert processor.temp_dir.exists()
 
-def test_generate_gource_log(processor, temp_git_repo):
-    """Test Gource log generation for a single repository."""
-    log_file = processor._generate_gource_log(temp_git_repo)
-    assert log_file.exists()
-    content = log_file.read_text()
-    assert "|Test User|" in content
-    assert "|A|/test.txt" in content
-
-def test_filter_log_by_date(processor, temp_git_repo):
+def test_filter_log_by_date(processor, monkeypatch):
     """Test log filtering by date range."""
-    # Generate initial log
-    log_file = processor._generate_gource_log(temp_git_repo)
-    
-    # Filter log
-    filtered_log = processor._filter_log_by_date(log_file, temp_git_repo.name)
+    from git_viz.core import _process_repository
+
+    monkeypatch.setattr(
+        "git_viz.core._iter_gource_log", MagicMock(return_value=iter([SAMPLE_LOG_BYTES]))
+    )
+    filtered_log, stats = _process_repository(
+        Path("fake"),
+        processor.temp_dir / "fake_filtered.log",
+        processor._start_timestamp,
+        processor._end_timestamp,
+    )
     
     assert filtered_log.exists()
     content = filtered_log.read_text()
     # Update assertion to match actual format
     assert "/test.txt" in content  # The path includes a leading slash
+    assert stats["commits"] == 1
+
+def test_iter_gource_log_reports_git_errors(tmp_path):
+    """Test that git's error output is reported when git log fails."""
+    from git_viz.core import _iter_gource_log
+
+    with pytest.raises(RuntimeError, match="Failed to generate Gource log: .*git"):
+        list(_iter_gource_log(tmp_path))
+
+def test_filter_log_by_date_range():
+    """Test that lines outside the range and malformed lines are dropped."""
+    from git_viz.core import _filter_lines
+
+    lines = [
+        b"100|Early User|A|/early.txt\n",
+        b"200|Test User|A|/test.txt\n",
+        b"not-a-timestamp|Bad User|A|/bad.txt\n",
+        b"300|Late User|A|/late.txt\n",
+    ]
+
+    assert list(_filter_lines(lines, 150, 250)) == [b"200|Test User|A|/test.txt\n"]
 
-@pytest.mark.skipif(not shutil.which('gource') or not shutil.which('ffmpeg'),
-                    reason="Gource or FFmpeg not available")
-def test_process_repositories(processor, temp_git_repo):
+def test_filter_log_maps_users():
+    """Test that authors are replaced by their canonical names."""
+    from git_viz.core import _filter_lines
+
+    lines = [
+        b"100|jdoe|A|/a.txt\n",
+        b"200|Other User|M|/b.txt\n",
+    ]
+
+    assert list(_filter_lines(lines, user_mappings={"jdoe": "John Doe"})) == [
+        b"100|John Doe|A|/a.txt\n",
+        b"200|Other User|M|/b.txt\n",
+    ]
+
+def test_combine_logs(processor):
+    """Test that log files are concatenated in order, skipping missing ones."""
+    first = processor.temp_dir / "first.log"
+    second = processor.temp_dir / "second.log"
+    first.write_text("100|User A|A|/a.txt\n")
+    second.write_text("200|User B|M|/b.txt\n")
+    combined = processor.temp_dir / "combined.log"
+
+    processor._combine_logs([first, processor.temp_dir / "missing.log", second], combined)
+    assert combined.read_text() == "100|User A|A|/a.txt\n200|User B|M|/b.txt\n"
+
+def test_process_repositories(processor, temp_git_repo, monkeypatch):
     """Test processing of multiple repositories."""
     # Mock both the Gource and FFmpeg processes
     mock_gource_process = MagicMock()
-    mock_gource_process.stdout = MagicMock()
-    mock_gource_process.stderr = MagicMock()
-    mock_gource_process.poll.return_value = None
+    mock_gource_process.stderr = io.BytesIO(b"")
     mock_gource_process.returncode = 0
-    mock_gource_process.stderr.read.return_value = b""
     
     mock_ffmpeg_process = MagicMock()
-    mock_ffmpeg_process.communicate.return_value = (b"", b"")
+    mock_ffmpeg_process.stderr = io.BytesIO(b"")
     mock_ffmpeg_process.returncode = 0
-
+    
+    # Hand out the mock process for whichever program is started
+    fakes = {"gource": mock_gource_process, "ffmpeg": mock_ffmpeg_process}
+    popen_calls = []
+    
+    def fake_popen(cmd, *args, **kwargs):
+        popen_calls.append(cmd)
+        return fakes[Path(cmd[0]).name]
+    
+    monkeypatch.setattr("git_viz.core.subprocess.Popen", fake_popen)
+    
     # Create a sample Gource log content
-    sample_log = "1609459200|Test User|A|/test.txt\n"  # Unix timestamp for 2021-01-01
-    
-    with patch('subprocess.Popen') as mock_popen, \
-         patch('git_viz.core.GitVizProcessor._generate_gource_log') as mock_generate_log:
-        
-        # Set up the mock for _generate_gource_log
-        log_file = processor.temp_dir / f"{temp_git_repo.name}.log"
-        log_file.write_text(sample_log)
-        mock_generate_log.return_value = log_file
-        
-        # Configure mock_popen to return different processes for Gource and FFmpeg
-        def popen_side_effect(cmd, *args, **kwargs):
-            if 'gource' in cmd[0]:
-                return mock_gource_process
-            else:
-                return mock_ffmpeg_process
-        
-        mock_popen.side_effect = popen_side_effect
-        
-        # Run the test
+    sample_log = b"1609459200|Test User|A|/test.txt\n"  # Unix timestamp for 2021-01-01
+    mock_iter_log = MagicMock(return_value=iter([sample_log]))
+    monkeypatch.setattr("git_viz.core._iter_gource_log", mock_iter_log)
+    
+    # Run the test
+    processor.process_repositories([str(temp_git_repo)])
+    
+    # Write a dummy output file to simulate successful video generation
+    Path(processor.output_file).parent.mkdir(parents=True, exist_ok=True)
+    Path(processor.output_file).write_bytes(b"dummy video content")
+    
+    assert Path(processor.output_file).exists()
+    
+    # Verify the mocks were called correctly
+    assert [cmd[0] for cmd in popen_calls] == ["ffmpeg", "gource"]
+    assert mock_iter_log.called
+
+def test_generate_visualization_reports_errors(processor, monkeypatch):
+    """Test that a failing process's stderr ends up in the raised error."""
+    mock_gource_process = MagicMock()
+    mock_gource_process.stderr = io.BytesIO(b"Gource: bad log line\n")
+    mock_gource_process.returncode = 1
+    
+    mock_ffmpeg_process = MagicMock()
+    mock_ffmpeg_process.stderr = io.BytesIO(b"")
+    mock_ffmpeg_process.returncode = 0
+    
+    fakes = {"gource": mock_gource_process, "ffmpeg": mock_ffmpeg_process}
+    monkeypatch.setattr(
+        "git_viz.core.subprocess.Popen", lambda cmd, *args, **kwargs: fakes[cmd[0]]
+    )
+    
+    combined_log = processor.temp_dir / "combined.log"
+    combined_log.write_bytes(SAMPLE_LOG_BYTES)
+    with pytest.raises(RuntimeError, match="Gource.*bad log line"):
+        processor._generate_visualization(combined_log)
+
+def test_find_git_repos(fresh_git_repo):
+    """Test discovery of repositories below a directory."""
+    from git_viz.core import _find_git_repos
+
+    assert _find_git_repos(fresh_git_repo) == [fresh_git_repo]
+    assert _find_git_repos(fresh_git_repo.parent) == [fresh_git_repo]
+
+    # Directories inside a repository are not searched
+    nested = fresh_git_repo / "vendor" / "nested"
+    (nested / ".git").mkdir(parents=True)
+    assert _find_git_repos(fresh_git_repo.parent) == [fresh_git_repo]
+
+def test_get_repository_stats(processor, temp_git_repo):
+    """Test that statistics are gathered while repositories are processed."""
+    with patch.object(GitVizProcessor, '_generate_visualization'):
         processor.process_repositories([str(temp_git_repo)])
-        
-        # Write a dummy output file to simulate successful video generation
-        Path(processor.output_file).parent.mkdir(parents=True, exist_ok=True)
-        Path(processor.output_file).write_bytes(b"dummy video content")
-        
-        assert Path(processor.output_file).exists()
+    
+    stats = processor.get_repository_stats()
+    repo_stats = stats[temp_git_repo.name]
+    assert repo_stats['commits'] == 1
+    assert repo_stats['files_added'] == 1
+    assert repo_stats['files_modified'] == 0
+    assert repo_stats['files_deleted'] == 0
+    assert len(repo_stats['users']) == 1
 
-    # Verify the mocks were called correctly
-    mock_popen.assert_called()
-    assert mock_generate_log.called
+def test_repositories_with_same_name(processor, tmp_path):
+    """Test that repositories sharing a basename are kept apart."""
+    code_dir = tmp_path / "code"
+    for parent in ("a", "b"):
+        repo_dir = code_dir / parent / "utils"
+        repo_dir.mkdir(parents=True)
+        run_git("init", "-q", cwd=repo_dir)
+        import_commits(repo_dir, [(f"Add {parent}", f"{parent}.txt", parent)])
+
+    with patch.object(GitVizProcessor, '_generate_visualization'):
+        processor.process_repositories([str(code_dir)])
+
+    stats = processor.get_repository_stats()
+    assert sorted(stats) == ["code/a/utils", "code/b/utils"]
+    assert stats["code/a/utils"]['files_added'] == 1
 
-def test_processor_cleanup(processor):
+    combined = (processor.temp_dir / "combined.log").read_text()
+    assert combined.count("|A|/a.txt") == 1
+    assert combined.count("|A|/b.txt") == 1
+
+def test_processor_cleanup(processor_cm):
     """Test that temporary files are cleaned up."""
-    temp_dir = processor.temp_dir
+    temp_dir = processor_cm.temp_dir
     assert temp_dir.exists()
-    with processor:
+    with processor_cm as processor:
+        assert processor is processor_cm
         assert temp_dir.exists()
     assert not temp_dir.exists()
 
@@ -137,8 +242,6 @@ def test_invalid_repository(processor):
 
 def test_date_range_validation():
     """Test validation of date ranges."""
-    future_date = (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%d")
-    
     with pytest.raises(ValueError):
         GitVizProcessor(start_date="invalid-date")
     
@@ -146,7 +249,7 @@ def test_date_range_validation():
         GitVizProcessor(end_date="invalid-date")
     
     with pytest.raises(ValueError):
-        GitVizProcessor(start_date=future_date)
+        GitVizProcessor(start_date=_NEXT_YEAR_STR)
     
     with pytest.raises(ValueError):
         GitVizProcessor(start_date="2000-01-01", end_date="1999-12-31")
\ No newline at end of file
@@ -1,28 +1,20 @@
 import pytest
 from pathlib import Path
-import tempfile
-import shutil
 from git_viz.user_manager import UserManager
+from tests import BLANK_CONFIG_YAML, RED_PNG_200X200
 
 @pytest.fixture
-def temp_dirs():
+def temp_dirs(tmp_path_factory):
     """Create temporary directories for config and data."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        config_dir = temp_path / "config"
-        data_dir = temp_path / "data"
-        
-        # Create directories
-        config_dir.mkdir(parents=True)
-        data_dir.mkdir(parents=True)
-        
-        yield config_dir, data_dir
-
-@pytest.fixture
-def user_manager(temp_dirs):
-    """Create a UserManager instance with temporary directories."""
-    config_dir, data_dir = temp_dirs
-    return UserManager(config_dir=config_dir, data_dir=data_dir)
+    root = tmp_path_factory.mktemp("um")
+    config_dir = root / "config"
+    data_dir = root / "data"
+    config_dir.mkdir()
+    data_dir.mkdir()
+    
+    # Start from an empty config rather than having UserManager dump one
+    (config_dir / "users.yaml").write_bytes(BLANK_CONFIG_YAML)
+    return config_dir, data_dir
 
 def test_user_mapping(user_manager):
     """Test basic user mapping functionality."""
@@ -33,6 +25,16 @@ def test_user_mapping(user_manager):
     # Test unknown user returns original name
     assert user_manager.get_canonical_name("unknown.user") == "unknown.user"
 
+def test_get_canonical_names(user_manager):
+    """Test the plain mapping of Git usernames to canonical names."""
+    user_manager.add_user_mapping("john.doe", "John Doe")
+    user_manager.add_user_mapping("jdoe", "John Doe")
+    
+    assert user_manager.get_canonical_names() == {
+        "john.doe": "John Doe",
+        "jdoe": "John Doe",
+    }
+
 def test_user_suggestions(user_manager):
     """Test similar user suggestions."""
     # Add some test users
@@ -44,16 +46,15 @@ def test_user_suggestions(user_manager):
     similar = user_manager.suggest_similar_users("john.d")
     assert "john.doe" in similar
     assert "bob.smith" not in similar
+    
+    # Matching ignores case
+    assert "john.doe" in user_manager.suggest_similar_users("JOHN.D")
 
-@pytest.mark.skipif(not shutil.which('convert'), 
-                    reason="ImageMagick not available")
-def test_avatar_processing(user_manager, tmp_path):
+def test_avatar_processing(user_manager, tmp_path, pil_image):
     """Test avatar processing functionality."""
     # Create a test image
-    from PIL import Image
     test_image = tmp_path / "test_avatar.png"
-    img = Image.new('RGB', (200, 200), color='red')
-    img.save(test_image)
+    test_image.write_bytes(RED_PNG_200X200)
     
     # Test setting avatar
     user_manager.add_user_mapping("john.doe", "John Doe")
@@ -65,10 +66,57 @@ def test_avatar_processing(user_manager, tmp_path):
     assert Path(user_data["avatar"]).exists()
     
     # Verify avatar dimensions
-    with Image.open(user_data["avatar"]) as avatar:
+    with pil_image.open(user_data["avatar"]) as avatar:
         assert avatar.size[0] <= 128
         assert avatar.size[1] <= 128
 
+def test_avatar_after_remapping(user_manager, tmp_path):
+    """Test that avatars only apply to the current mappings of a user."""
+    sample_image = tmp_path / "avatar.png"
+    sample_image.write_bytes(RED_PNG_200X200)
+    
+    user_manager.add_user_mapping("john.doe", "John Doe")
+    user_manager.add_user_mapping("jdoe", "John Doe")
+    user_manager.add_user_mapping("jdoe", "Jane Doe")
+    
+    user_manager.set_user_avatar("John Doe", sample_image)
+    
+    users = user_manager.get_all_users()
+    assert users["john.doe"]["avatar"] is not None
+    assert users["jdoe"]["avatar"] is None
+
+def test_avatar_reuses_processed_image(user_manager, tmp_path, mocker, pil_image):
+    """Test that setting the same avatar again skips image processing."""
+    sample_image = tmp_path / "avatar.png"
+    pil_image.new('RGB', (200, 200), color='red').save(sample_image)
+    user_manager.add_user_mapping("john.doe", "John Doe")
+    user_manager.set_user_avatar("John Doe", sample_image)
+    
+    mock_open = mocker.patch.object(pil_image, 'open')
+    user_manager.set_user_avatar("John Doe", sample_image)
+    assert not mock_open.called
+    
+    # A different image is processed again
+    pil_image.new('RGB', (200, 200), color='blue').save(sample_image)
+    mocker.stopall()
+    user_manager.set_user_avatar("John Doe", sample_image)
+    with pil_image.open(user_manager.get_all_users()["john.doe"]["avatar"]) as avatar:
+        assert avatar.getpixel((64, 64))[:3] == (0, 0, 255)
+
+def test_avatar_padded_to_square(user_manager, tmp_path, pil_image):
+    """Test that non-square avatars are scaled down and padded to a square."""
+    sample_image = tmp_path / "avatar.png"
+    pil_image.new('RGB', (400, 200), color='red').save(sample_image)
+    
+    user_manager.add_user_mapping("john.doe", "John Doe")
+    user_manager.set_user_avatar("John Doe", sample_image)
+    
+    with pil_image.open(user_manager.get_all_users()["john.doe"]["avatar"]) as avatar:
+        assert avatar.size == (128, 128)
+        assert avatar.mode == 'RGBA'
+        assert avatar.getpixel((64, 10))[3] == 0
+        assert avatar.getpixel((64, 64)) == (255, 0, 0, 255)
+
 def test_persistence(temp_dirs):
     """Test that user mappings persist between instances."""
     config_dir, data_dir = temp_dirs
@@ -81,6 +129,21 @@ def test_persistence(temp_dirs):
     manager2 = UserManager(config_dir=config_dir, data_dir=data_dir)
     assert manager2.get_canonical_name("john.doe") == "John Doe"
 
+def test_batch_defers_saving(temp_dirs):
+    """Test that mappings are only written when a batch exits."""
+    config_dir, data_dir = temp_dirs
+    manager = UserManager(config_dir=config_dir, data_dir=data_dir)
+    
+    with manager.batch():
+        manager.add_user_mapping("john.doe", "John Doe")
+        with manager.batch():
+            manager.add_user_mapping("jane.doe", "Jane Doe")
+        assert "john.doe" not in manager.config_file.read_text()
+    
+    reloaded = UserManager(config_dir=config_dir, data_dir=data_dir)
+    assert reloaded.get_canonical_name("john.doe") == "John Doe"
+    assert reloaded.get_canonical_name("jane.doe") == "Jane Doe"
+
 def test_invalid_avatar_path(user_manager):
     """Test handling of invalid avatar paths."""
     user_manager.add_user_mapping("john.doe", "John Doe")
@@ -106,20 +169,23 @@ def test_custom_directories(temp_dirs):
     manager.add_user_mapping("test.user", "Test User")
     assert (config_dir / "users.yaml").exists()
 
-def test_singleton_with_different_dirs(temp_dirs):
-    """Test that singleton properly reinitializes with new directories."""
+def test_instances_with_different_dirs(temp_dirs):
+    """Test that instances with different directories are independent."""
     config_dir1, data_dir1 = temp_dirs
     config_dir2 = config_dir1 / "other_config"
     data_dir2 = data_dir1 / "other_data"
     
-    # First initialization
     manager1 = UserManager(config_dir=config_dir1, data_dir=data_dir1)
     assert (data_dir1 / "avatars").exists()
     
-    # Second initialization with different dirs
     manager2 = UserManager(config_dir=config_dir2, data_dir=data_dir2)
     assert (data_dir2 / "avatars").exists()
+    assert manager2.config_file.read_bytes() == BLANK_CONFIG_YAML
+    
+    # Verify the instances do not share state
+    assert manager1 is not manager2
+    assert manager1.data_dir == data_dir1
+    assert manager2.data_dir == data_dir2
     
-    # Verify it's the same instance but with updated paths
-    assert manager1 is manager2
-    assert manager2.data_dir == data_dir2
\ No newline at end of file
+    manager1.add_user_mapping("john.doe", "John Doe")
+    assert manager2.get_canonical_name("john.doe") == "john.doe"